@@ -1,15 +1,20 @@
 """FastAPI application for serving HLS noise streams (white/pink/brown)."""
 
 import logging
-import threading
+import os
+import re
 from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import Optional
 
-from fastapi import FastAPI, HTTPException
+import anyio.to_thread
+import orjson
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, Response
+from fastapi.responses import FileResponse, JSONResponse, Response
 
 from config import get_config
+from health_interceptor import HealthInterceptor
 from noise_manager import NoiseStreamManager
 
 # Global configuration and stream manager
@@ -24,46 +29,62 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-stream_manager = NoiseStreamManager(config.app.hls_dir, config.ffmpeg, config.app.noise_types)
-_monitor_thread: threading.Thread | None = None
-_monitor_running = False
-
-
-def _monitor_stream_health() -> None:
-    global _monitor_running
-    while _monitor_running:
-        try:
-            health = stream_manager.health_check()
-            for stream in health.get("streams", []):
-                if stream["status"] == "unhealthy" and stream.get("process_running"):
-                    stream_id = stream["stream_id"]
-                    logger.warning("Noise stream unhealthy; restarting: %s", stream_id)
-                    stream_manager.stop_stream(stream_id)
-                    stream_manager.start_stream(stream_id)
-            # Check every 10 seconds
-            for _ in range(10):
-                if not _monitor_running:
-                    break
-                threading.Event().wait(1)
-        except Exception as e:
-            logger.error("Error in stream health monitor: %s", str(e))
-            threading.Event().wait(5)
+# Allow-lists for path parameters of the HLS routes
+_FN_RE = re.compile(r"[A-Za-z0-9_.-]+\.(m3u8|ts)")
+_SID_RE = re.compile(r"noise_[a-z]+")
+_MEDIA_TYPES = {"m3u8": "application/x-mpegurl", "ts": "video/mp2t"}
+
+stream_manager = NoiseStreamManager(
+    config.app.hls_dir, config.ffmpeg, config.app.noise_types, cache_dir=config.app.cache_dir
+)
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson.
+
+    Defined locally because fastapi.responses.ORJSONResponse is deprecated in
+    recent FastAPI releases.
+    """
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
+
+
+def _filesystem_type(path: Path) -> Optional[str]:
+    """Return the filesystem type of the mount containing path, if known."""
+    path = str(path.resolve())
+    best, fstype = "", None
+    try:
+        with open("/proc/self/mounts") as mounts:
+            for line in mounts:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                # Mount points escape spaces as \040
+                mount_point = fields[1].replace("\\040", " ")
+                prefix = mount_point.rstrip("/") + "/"
+                if (path == mount_point or path.startswith(prefix)) and len(mount_point) >= len(best):
+                    best, fstype = mount_point, fields[2]
+    except OSError:
+        return None
+    return fstype
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global _monitor_thread, _monitor_running
     logger.info("Starting noise-stream application")
     config.app.hls_dir.mkdir(parents=True, exist_ok=True)
+    fstype = _filesystem_type(config.app.hls_dir)
+    if fstype is not None and fstype != "tmpfs":
+        logger.warning("HLS_DIR is not on tmpfs; segments will hit disk: hls_dir=%s, fstype=%s",
+                       config.app.hls_dir, fstype)
 
-    _monitor_running = True
-    _monitor_thread = threading.Thread(target=_monitor_stream_health, daemon=True)
-    _monitor_thread.start()
-    logger.info("Started stream health monitoring thread")
+    stream_manager.start_supervisor()
 
     # Auto-start streams on startup
     try:
-        result = stream_manager.start_all_streams()
+        # Spawning FFmpeg blocks; noise loops are rendered in the background
+        result = await anyio.to_thread.run_sync(stream_manager.start_all_streams)
         logger.info(
             "Auto-started noise streams: started=%d, failed=%d, total=%d",
             result.get("started", 0),
@@ -76,19 +97,19 @@ async def lifespan(app: FastAPI):
     yield
 
     logger.info("Shutting down noise-stream application")
-    _monitor_running = False
-    if _monitor_thread:
-        _monitor_thread.join(timeout=2)
-    stream_manager.stop_all_streams()
+    # Both join threads or wait on FFmpeg exits
+    await anyio.to_thread.run_sync(stream_manager.stop_supervisor)
+    await anyio.to_thread.run_sync(stream_manager.stop_all_streams)
 
 
-app = FastAPI(
+fastapi_app = FastAPI(
     title="Noise Stream",
     description="HLS audio streaming of generated noise (white/pink/brown)",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
-app.add_middleware(
+fastapi_app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_methods=["GET", "HEAD", "OPTIONS"],
@@ -96,8 +117,8 @@ app.add_middleware(
 )
 
 
-@app.get("/")
-async def root():
+@fastapi_app.get("/")
+def root():
     status = stream_manager.get_status()
     return {
         "name": "Noise Stream",
@@ -117,8 +138,8 @@ async def root():
     }
 
 
-@app.get("/status")
-async def status():
+@fastapi_app.get("/status")
+def status():
     mgr_status = stream_manager.get_status()
     return {
         "hls_dir": str(config.app.hls_dir),
@@ -126,13 +147,8 @@ async def status():
     }
 
 
-@app.get("/health")
-async def health():
-    return stream_manager.health_check()
-
-
-@app.post("/stream/start")
-async def start_streams():
+@fastapi_app.post("/stream/start")
+def start_streams():
     try:
         return stream_manager.start_all_streams()
     except Exception as exc:
@@ -140,21 +156,21 @@ async def start_streams():
         raise HTTPException(status_code=500, detail=f"Error starting streams: {exc}")
 
 
-@app.post("/stream/stop")
-async def stop_streams():
+@fastapi_app.post("/stream/stop")
+def stop_streams():
     return stream_manager.stop_all_streams()
 
 
-@app.get("/stream/{stream_id}")
-async def get_stream_info(stream_id: str):
+@fastapi_app.get("/stream/{stream_id}")
+def get_stream_info(stream_id: str):
     stream = stream_manager.get_stream(stream_id)
     if not stream:
         raise HTTPException(status_code=404, detail="Stream not found")
     return stream.to_dict()
 
 
-@app.get("/stream/{stream_id}/health")
-async def get_stream_health(stream_id: str):
+@fastapi_app.get("/stream/{stream_id}/health")
+def get_stream_health(stream_id: str):
     health = stream_manager.health_check()
     for s in health.get("streams", []):
         if s["stream_id"] == stream_id:
@@ -162,8 +178,8 @@ async def get_stream_health(stream_id: str):
     raise HTTPException(status_code=404, detail="Stream not found")
 
 
-@app.post("/stream/{stream_id}/start")
-async def start_stream(stream_id: str):
+@fastapi_app.post("/stream/{stream_id}/start")
+def start_stream(stream_id: str):
     try:
         result = stream_manager.start_stream(stream_id)
         if not result["success"]:
@@ -178,8 +194,8 @@ async def start_stream(stream_id: str):
         raise HTTPException(status_code=500, detail=f"Error starting stream: {exc}")
 
 
-@app.post("/stream/{stream_id}/stop")
-async def stop_stream(stream_id: str):
+@fastapi_app.post("/stream/{stream_id}/stop")
+def stop_stream(stream_id: str):
     result = stream_manager.stop_stream(stream_id)
     if not result["success"]:
         if result.get("error") == "Stream not found":
@@ -188,58 +204,60 @@ async def stop_stream(stream_id: str):
     return result
 
 
-@app.get("/hls/{stream_id}/{filename}")
-async def get_hls_file(stream_id: str, filename: str):
-    if ".." in filename or filename.startswith("/"):
+def _playlist_response(file_path: Path, st: os.stat_result, request: Request) -> Response:
+    """Serve a playlist from disk with a weak mtime/size ETag.
+
+    FFmpeg replaces the playlist via atomic rename, so the file can be sent
+    as-is; clients re-polling within the same segment get a 304.
+    """
+    etag = f'W/"{st.st_mtime_ns}-{st.st_size}"'
+    headers = {"Cache-Control": "max-age=1", "ETag": etag}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(file_path, media_type=_MEDIA_TYPES["m3u8"], headers=headers, stat_result=st)
+
+
+def _hls_file_response(file_path: Path, extension: str, request: Request) -> Response:
+    try:
+        st = file_path.stat()
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found")
+    if extension == "m3u8":
+        return _playlist_response(file_path, st, request)
+    return FileResponse(file_path, media_type=_MEDIA_TYPES[extension], stat_result=st)
+
+
+@fastapi_app.get("/hls/{stream_id}/{filename}")
+def get_hls_file(stream_id: str, filename: str, request: Request):
+    match = _FN_RE.fullmatch(filename)
+    if not match:
         logger.warning("Invalid filename rejected: %s", filename)
         raise HTTPException(status_code=400, detail="Invalid filename")
-    if ".." in stream_id or "/" in stream_id:
+    if not _SID_RE.fullmatch(stream_id):
         logger.warning("Invalid stream_id rejected: %s", stream_id)
         raise HTTPException(status_code=400, detail="Invalid stream_id")
     file_path = config.app.hls_dir / stream_id / filename
-    if not file_path.exists():
+    try:
+        return _hls_file_response(file_path, match.group(1), request)
+    except HTTPException:
         logger.warning("HLS file not found: stream_id=%s, filename=%s", stream_id, filename)
-        raise HTTPException(status_code=404, detail="File not found")
-    if filename.endswith(".m3u8"):
-        media_type = "application/x-mpegurl"
-        # Read playlist into memory to avoid race condition with FFmpeg updates
-        content = file_path.read_bytes()
-        # Prevent caching so clients always get fresh playlist
-        return Response(
-            content=content,
-            media_type=media_type,
-            headers={"Cache-Control": "no-cache, no-store, must-revalidate"},
-        )
-    elif filename.endswith(".ts"):
-        media_type = "video/mp2t"
-        return FileResponse(file_path, media_type=media_type)
-    else:
-        raise HTTPException(status_code=400, detail="Invalid file type")
+        raise
 
 
-@app.get("/hls/{filename}")
-async def get_legacy_hls_file(filename: str):
-    if ".." in filename or filename.startswith("/"):
+@fastapi_app.get("/hls/{filename}")
+def get_legacy_hls_file(filename: str, request: Request):
+    match = _FN_RE.fullmatch(filename)
+    if not match:
         raise HTTPException(status_code=400, detail="Invalid filename")
-    streams = stream_manager.get_streams()
-    for stream_id, stream_info in streams.items():
-        if stream_info.hls_path:
-            file_path = Path(stream_info.hls_path) / filename
-            if file_path.exists():
-                if filename.endswith(".m3u8"):
-                    media_type = "application/x-mpegurl"
-                    content = file_path.read_bytes()
-                    return Response(
-                        content=content,
-                        media_type=media_type,
-                        headers={"Cache-Control": "no-cache, no-store, must-revalidate"},
-                    )
-                elif filename.endswith(".ts"):
-                    media_type = "video/mp2t"
-                    return FileResponse(file_path, media_type=media_type)
-                else:
-                    raise HTTPException(status_code=400, detail="Invalid file type")
-    raise HTTPException(status_code=404, detail="File not found")
+    file_path = stream_manager.find_hls_file(filename)
+    if file_path is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    return _hls_file_response(file_path, match.group(1), request)
+
+
+# Health probes are answered before reaching FastAPI routing and middleware
+app = HealthInterceptor(fastapi_app, stream_manager.health_check)
 
 
 if __name__ == "__main__":
@@ -40,7 +40,13 @@ class FFmpegConfig:
         default_factory=lambda: _get_int_env("SAMPLE_RATE", 44100, min_val=8000)
     )
     audio_bitrate: str = field(
-        default_factory=lambda: os.getenv("AUDIO_BITRATE", "128k")
+        default_factory=lambda: os.getenv("AUDIO_BITRATE", "64k")
+    )
+    audio_codec: str = field(
+        default_factory=lambda: os.getenv("AUDIO_CODEC", "aac")
+    )
+    aac_coder: str = field(
+        default_factory=lambda: os.getenv("AAC_CODER", "fast")
     )
     segment_time: int = field(
         default_factory=lambda: _get_int_env("SEGMENT_TIME", 2, min_val=1)
@@ -48,6 +54,15 @@ class FFmpegConfig:
     list_size: int = field(
         default_factory=lambda: _get_int_env("LIST_SIZE", 5, min_val=1)
     )
+    loop_duration: int = field(
+        default_factory=lambda: _get_int_env("LOOP_DURATION", 600, min_val=0)
+    )
+    cpu_affinity: bool = field(
+        default_factory=lambda: os.getenv("FFMPEG_CPU_AFFINITY", "true").lower() == "true"
+    )
+    nice: int = field(
+        default_factory=lambda: _get_int_env("FFMPEG_NICE", 5, min_val=0)
+    )
 
 
 @dataclass
@@ -57,11 +72,14 @@ class AppConfig:
     host: str = field(default_factory=lambda: os.getenv("HOST", "0.0.0.0"))
     port: int = field(default_factory=lambda: _get_port_env("PORT", 8000))
     hls_dir: Path = field(
-        default_factory=lambda: Path(os.getenv("HLS_DIR", "/app/hls"))
+        default_factory=lambda: Path(os.getenv("HLS_DIR", "/dev/shm/noise-stream"))
     )
     config_dir: Path = field(
         default_factory=lambda: Path(os.getenv("CONFIG_DIR", "/app/config"))
     )
+    cache_dir: Path = field(
+        default_factory=lambda: Path(os.getenv("CACHE_DIR", "/app/cache"))
+    )
     rabbitmq_url: Optional[str] = field(
         default_factory=lambda: os.getenv("RABBITMQ_URL")
     )
@@ -0,0 +1,58 @@
+"""Pure ASGI wrapper that answers health probes without entering FastAPI."""
+
+from typing import Awaitable, Callable, Iterable
+
+import orjson
+
+Scope = dict
+Receive = Callable[[], Awaitable[dict]]
+Send = Callable[[dict], Awaitable[None]]
+ASGIApp = Callable[[Scope, Receive, Send], Awaitable[None]]
+
+
+class HealthInterceptor:
+    """Serves health probe paths directly and forwards everything else to the app.
+
+    Probes skip routing, middleware and dependency resolution entirely; the
+    payload comes from the stream manager's cached health snapshot.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        health_check: Callable[[], dict],
+        health_paths: Iterable[str] = ("/health",),
+    ):
+        """Initialize interceptor.
+
+        Args:
+            app: Wrapped ASGI application.
+            health_check: Callable returning the health payload.
+            health_paths: Exact request paths answered by the interceptor.
+        """
+        self.app = app
+        self.health_check = health_check
+        self.health_paths = frozenset(health_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # OPTIONS falls through so CORS preflights reach CORSMiddleware
+        if (scope["type"] != "http" or scope["path"] not in self.health_paths
+                or scope["method"] == "OPTIONS"):
+            await self.app(scope, receive, send)
+            return
+        if scope["method"] != "GET":
+            await self._respond(send, 405, b'{"detail":"Method Not Allowed"}', [(b"allow", b"GET")])
+            return
+        # Runs on the event loop: health_check must not block on stream locks
+        body = orjson.dumps(self.health_check())
+        await self._respond(send, 200, body, [(b"access-control-allow-origin", b"*")])
+
+    @staticmethod
+    async def _respond(send: Send, status: int, body: bytes, extra_headers: list[tuple[bytes, bytes]]) -> None:
+        headers = [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("latin-1")),
+            *extra_headers,
+        ]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,157 @@
+"""inotify-based watcher for HLS output directories."""
+
+import logging
+import os
+import selectors
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+from inotify_simple import INotify, flags
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "stream.m3u8"
+# FFmpeg writes the live playlist to a temp file and renames it into place
+_MANIFEST_FLAGS = flags.CLOSE_WRITE | flags.MOVED_TO
+_ADDED_FLAGS = flags.CREATE | flags.MOVED_TO
+_REMOVED_FLAGS = flags.DELETE | flags.MOVED_FROM
+_WATCH_FLAGS = _MANIFEST_FLAGS | _ADDED_FLAGS | _REMOVED_FLAGS
+
+
+class HLSWatcher:
+    """Watches HLS output directories, reporting file changes and stale playlists.
+
+    A single thread blocks on the inotify descriptor and only wakes when FFmpeg
+    touches a file or when the nearest staleness deadline expires.
+    """
+
+    def __init__(
+        self,
+        stale_after: float,
+        on_stale: Callable[[str], None],
+        on_file_added: Optional[Callable[[str, str], None]] = None,
+        on_file_removed: Optional[Callable[[str, str], None]] = None,
+    ):
+        """Initialize watcher.
+
+        Args:
+            stale_after: Seconds without a playlist update before a stream is stale.
+            on_stale: Callback invoked with the stream_id of a stale stream.
+            on_file_added: Callback invoked with (stream_id, filename) for new files.
+            on_file_removed: Callback invoked with (stream_id, filename) for removed files.
+        """
+        self.stale_after = stale_after
+        self.on_stale = on_stale
+        self.on_file_added = on_file_added
+        self.on_file_removed = on_file_removed
+        self._inotify = INotify()
+        self._lock = threading.Lock()
+        self._wd_to_stream: dict[int, str] = {}
+        self._stream_to_wd: dict[str, int] = {}
+        self._deadlines: dict[str, float] = {}
+        self._selector = selectors.DefaultSelector()
+        self._wake_r, self._wake_w = os.pipe()
+        self._selector.register(self._inotify.fileno(), selectors.EVENT_READ)
+        self._selector.register(self._wake_r, selectors.EVENT_READ)
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        logger.info("Started HLS watcher: stale_after=%.1fs", self.stale_after)
+
+    def stop(self) -> None:
+        self._running = False
+        self._wake()
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def watch(self, stream_id: str, hls_dir: Path) -> None:
+        """Watch a stream's HLS directory and (re-)arm its staleness deadline.
+
+        Files already present are reported through on_file_added.
+        """
+        wd = self._inotify.add_watch(str(hls_dir), _WATCH_FLAGS)
+        with self._lock:
+            self._wd_to_stream[wd] = stream_id
+            self._stream_to_wd[stream_id] = wd
+            self._deadlines[stream_id] = time.monotonic() + self.stale_after
+        self._wake()
+        if self.on_file_added:
+            with os.scandir(hls_dir) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        self.on_file_added(stream_id, entry.name)
+
+    def disarm(self, stream_id: str) -> None:
+        """Stop staleness tracking for a stream; file events are still reported."""
+        with self._lock:
+            self._deadlines.pop(stream_id, None)
+        self._wake()
+
+    def _wake(self) -> None:
+        try:
+            os.write(self._wake_w, b"\0")
+        except OSError:
+            pass
+
+    def _next_timeout(self) -> Optional[float]:
+        with self._lock:
+            if not self._deadlines:
+                return None
+            return max(0.0, min(self._deadlines.values()) - time.monotonic())
+
+    def _handle_events(self) -> None:
+        events = self._inotify.read(timeout=0)
+        now = time.monotonic()
+        added: list[tuple[str, str]] = []
+        removed: list[tuple[str, str]] = []
+        with self._lock:
+            for event in events:
+                stream_id = self._wd_to_stream.get(event.wd)
+                if not stream_id or not event.name or event.mask & flags.ISDIR:
+                    continue
+                if event.mask & _ADDED_FLAGS:
+                    added.append((stream_id, event.name))
+                elif event.mask & _REMOVED_FLAGS:
+                    removed.append((stream_id, event.name))
+                if (event.mask & _MANIFEST_FLAGS and event.name == MANIFEST_NAME
+                        and stream_id in self._deadlines):
+                    self._deadlines[stream_id] = now + self.stale_after
+        if self.on_file_added:
+            for stream_id, name in added:
+                self.on_file_added(stream_id, name)
+        if self.on_file_removed:
+            for stream_id, name in removed:
+                self.on_file_removed(stream_id, name)
+
+    def _pop_expired(self) -> list[str]:
+        now = time.monotonic()
+        with self._lock:
+            expired = [s for s, deadline in self._deadlines.items() if deadline <= now]
+            # One-shot: the stream is re-armed by watch() once it restarts
+            for stream_id in expired:
+                del self._deadlines[stream_id]
+            return expired
+
+    def _run(self) -> None:
+        while self._running:
+            try:
+                for key, _ in self._selector.select(self._next_timeout()):
+                    if key.fileobj == self._wake_r:
+                        os.read(self._wake_r, 4096)
+                    else:
+                        self._handle_events()
+                for stream_id in self._pop_expired():
+                    logger.warning("HLS playlist stale: stream_id=%s, no update for %.1fs",
+                                   stream_id, self.stale_after)
+                    self.on_stale(stream_id)
+            except Exception as e:
+                logger.error("Error in HLS watcher: %s", str(e))
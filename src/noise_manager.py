@@ -1,7 +1,11 @@
 """Stream manager for handling multiple noise streams."""
 
 import logging
+import os
+import queue
+import selectors
 import threading
+import time
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
@@ -9,10 +13,14 @@ from pathlib import Path
 from typing import Optional
 
 from config import FFmpegConfig
-from noise_runner import NoiseFFmpegRunner
+from hls_watcher import HLSWatcher
+from noise_runner import NoiseFFmpegRunner, render_noise_loop
 
 logger = logging.getLogger(__name__)
 
+# Minimum seconds between automatic restarts of the same stream
+_RESTART_BACKOFF = 5.0
+
 
 class StreamState(str, Enum):
     STOPPED = "stopped"
@@ -28,39 +36,62 @@ class StreamInfo:
     runner: NoiseFFmpegRunner
     state: StreamState = StreamState.STOPPED
     started_at: Optional[datetime] = None
+    started_at_iso: Optional[str] = None
     error_message: Optional[str] = None
     hls_path: Optional[str] = None
+    # Guards state/started_at/error_message transitions of this stream
+    lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
+    # Process state mirrored from the runner by the manager's lifecycle hooks
+    running: bool = False
+    pid: Optional[int] = None
+    _static_dict: dict = field(init=False, repr=False)
+    _manifest_path_cached: Optional[str] = field(init=False, repr=False, default=None)
 
-    def to_dict(self) -> dict:
-        runner_status = self.runner.get_status()
-        return {
+    def __post_init__(self) -> None:
+        if self.hls_path:
+            self._manifest_path_cached = os.path.join(self.hls_path, "stream.m3u8")
+        # Key order matches the serialized output; mutable keys are filled in by to_dict()
+        self._static_dict = {
             "stream_id": self.stream_id,
             "noise_type": self.noise_type,
-            "state": self.state.value,
-            "running": runner_status.get("running", False),
-            "pid": runner_status.get("pid"),
-            "started_at": self.started_at.isoformat() if self.started_at else None,
-            "error_message": self.error_message,
+            "state": None,
+            "running": None,
+            "pid": None,
+            "started_at": None,
+            "error_message": None,
             "hls_path": self.hls_path,
             "stream_url": f"/hls/{self.stream_id}/stream.m3u8" if self.hls_path else None,
         }
 
+    def mark_started(self, pid: Optional[int]) -> None:
+        self.running = True
+        self.pid = pid
+
+    def mark_exited(self) -> None:
+        self.running = False
+        self.pid = None
+
+    def to_dict(self) -> dict:
+        out = self._static_dict.copy()
+        out["state"] = self.state.value
+        out["running"] = self.running
+        out["pid"] = self.pid
+        out["started_at"] = self.started_at_iso
+        out["error_message"] = self.error_message
+        return out
+
     def health_check(self) -> dict:
-        import time
-        runner_status = self.runner.get_status()
-        is_running = runner_status.get("running", False)
+        # Mirrored flag, never the runner lock: must not wait on a stopping runner
+        is_running = self.running
         hls_available = False
         manifest_fresh = False
-        if self.hls_path:
-            manifest_path = Path(self.hls_path) / "stream.m3u8"
-            hls_available = manifest_path.exists()
-            if hls_available:
-                try:
-                    mtime = manifest_path.stat().st_mtime
-                    current_time = time.time()
-                    manifest_fresh = (current_time - mtime) < 10.0
-                except OSError:
-                    manifest_fresh = False
+        if self._manifest_path_cached:
+            try:
+                st = os.stat(self._manifest_path_cached)
+                hls_available = True
+                manifest_fresh = (time.time() - st.st_mtime) < 10.0
+            except OSError:
+                pass
         if self.state == StreamState.RUNNING and is_running and hls_available and manifest_fresh:
             status = "healthy"
         elif self.state == StreamState.RUNNING and is_running and hls_available and not manifest_fresh:
@@ -85,21 +116,254 @@ class StreamInfo:
 class NoiseStreamManager:
     """Manages multiple noise streams (white, pink, brown)."""
 
-    def __init__(self, base_hls_dir: Path, base_ffmpeg_config: FFmpegConfig, noise_types: list[str]):
+    def __init__(
+        self,
+        base_hls_dir: Path,
+        base_ffmpeg_config: FFmpegConfig,
+        noise_types: list[str],
+        cache_dir: Optional[Path] = None,
+    ):
         self.base_hls_dir = base_hls_dir
+        self.cache_dir = cache_dir if cache_dir is not None else base_hls_dir.parent / "cache"
         self.base_ffmpeg_config = base_ffmpeg_config
         self.noise_types = [n.lower() for n in noise_types]
+        # Copy-on-write: replaced wholesale under _write_lock, read without locking
         self._streams: dict[str, StreamInfo] = {}
-        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        # (monotonic timestamp, snapshot) pairs; cleared on every state transition.
+        # A snapshot is only stored if no transition happened while it was built.
+        self._status_cache: tuple[float, Optional[dict]] = (0.0, None)
+        self._health_cache: tuple[float, Optional[dict]] = (0.0, None)
+        self._health_ttl = 1.0
+        self._generation = 0
         self._white_noise_sample = Path("/app/WhiteNoise.mp3")
+        self._restart_queue: queue.Queue[Optional[str]] = queue.Queue()
+        self._pending_restarts: set[str] = set()
+        self._restart_lock = threading.Lock()
+        self._last_restart: dict[str, float] = {}
+        self._supervisor_thread: Optional[threading.Thread] = None
+        self._supervisor_stop = threading.Event()
+        # HLS filename -> stream_ids holding a file of that name
+        self._file_index: dict[str, set[str]] = {}
+        self._file_index_lock = threading.Lock()
+        # One thread serves the stderr pipes and pidfds of every FFmpeg process
+        self._selector = selectors.EpollSelector()
+        self._event_thread: Optional[threading.Thread] = None
+        # (stream_id, loop_file) pairs rendered one at a time in the background
+        self._render_queue: queue.Queue[tuple[str, Path]] = queue.Queue()
+        self._render_thread: Optional[threading.Thread] = None
+        self._watcher = HLSWatcher(
+            3 * base_ffmpeg_config.segment_time,
+            self._on_manifest_stale,
+            on_file_added=self._on_file_added,
+            on_file_removed=self._on_file_removed,
+        )
+
+    def start_supervisor(self) -> None:
+        """Start the HLS watcher and the thread that restarts failed streams."""
+        self._supervisor_stop.clear()
+        self._watcher.start()
+        self._supervisor_thread = threading.Thread(target=self._supervise, daemon=True)
+        self._supervisor_thread.start()
+        logger.info("Started stream supervisor thread")
+
+    def stop_supervisor(self) -> None:
+        self._supervisor_stop.set()
+        self._restart_queue.put(None)
+        if self._supervisor_thread:
+            self._supervisor_thread.join(timeout=2)
+            self._supervisor_thread = None
+        self._watcher.stop()
+
+    def _request_restart(self, stream_id: str) -> None:
+        with self._restart_lock:
+            if stream_id in self._pending_restarts:
+                return
+            self._pending_restarts.add(stream_id)
+        self._restart_queue.put(stream_id)
+
+    def _cancel_restart(self, stream_id: str) -> None:
+        with self._restart_lock:
+            self._pending_restarts.discard(stream_id)
+
+    def _on_process_exit(self, stream_id: str, pid: int, exit_code: int) -> None:
+        stream_info = self._streams.get(stream_id)
+        if not stream_info:
+            return
+        with stream_info.lock:
+            # Ignore exits of a process that has already been replaced
+            if stream_info.pid != pid:
+                return
+            stream_info.mark_exited()
+            restart = stream_info.state == StreamState.RUNNING
+            if restart:
+                stream_info.state = StreamState.ERROR
+                error = stream_info.runner.last_error
+                stream_info.error_message = (f"FFmpeg exited with code {exit_code}: {error}" if error
+                                             else f"FFmpeg exited with code {exit_code}")
+            self._invalidate_snapshots()
+        if not restart:
+            return
+        logger.warning("Noise stream exited; restarting: %s", stream_id)
+        self._request_restart(stream_id)
+
+    def _on_manifest_stale(self, stream_id: str) -> None:
+        stream = self.get_stream(stream_id)
+        if not stream or stream.state != StreamState.RUNNING:
+            return
+        logger.warning("Noise stream unhealthy; restarting: %s", stream_id)
+        self._request_restart(stream_id)
+
+    def _on_file_added(self, stream_id: str, filename: str) -> None:
+        with self._file_index_lock:
+            self._file_index.setdefault(filename, set()).add(stream_id)
+
+    def _on_file_removed(self, stream_id: str, filename: str) -> None:
+        with self._file_index_lock:
+            owners = self._file_index.get(filename)
+            if owners and stream_id in owners:
+                owners.discard(stream_id)
+                if not owners:
+                    del self._file_index[filename]
+
+    def find_hls_file(self, filename: str) -> Optional[Path]:
+        """Resolve a bare HLS filename to the stream directory that holds it.
+
+        Every stream writes the same names, so the first configured noise type
+        holding the file wins; playlist and segments then come from one stream.
+        """
+        with self._file_index_lock:
+            owners = self._file_index.get(filename)
+            if not owners:
+                return None
+            for noise_type in self.noise_types:
+                stream_id = f"noise_{noise_type}"
+                if stream_id in owners:
+                    return self.base_hls_dir / stream_id / filename
+        return None
+
+    def _ensure_event_pump(self) -> None:
+        if self._event_thread is None:
+            self._event_thread = threading.Thread(target=self._event_pump, daemon=True)
+            self._event_thread.start()
+
+    def _event_pump(self) -> None:
+        while True:
+            # Blocks until a registered fd is ready; runners add their fds as
+            # they start, which wakes a pending epoll_wait
+            for key, _ in self._selector.select():
+                try:
+                    key.data()
+                except Exception as e:
+                    logger.error("Error handling FFmpeg process event: %s", str(e))
+
+    def _supervise(self) -> None:
+        while True:
+            stream_id = self._restart_queue.get()
+            if stream_id is None:
+                break
+            delay = self._last_restart.get(stream_id, 0.0) + _RESTART_BACKOFF - time.monotonic()
+            if delay > 0 and self._supervisor_stop.wait(delay):
+                break
+            with self._restart_lock:
+                self._pending_restarts.discard(stream_id)
+            self._last_restart[stream_id] = time.monotonic()
+            stream_info = self._streams.get(stream_id)
+            if not stream_info:
+                continue
+            try:
+                with stream_info.lock:
+                    # A user stop since the restart was requested wins
+                    if stream_info.state not in (StreamState.RUNNING, StreamState.ERROR):
+                        continue
+                    self._watcher.disarm(stream_id)
+                    if stream_info.runner.is_running():
+                        self._stop_locked(stream_info)
+                    self._start_locked(stream_info)
+            except Exception as e:
+                logger.error("Error restarting stream %s: %s", stream_id, str(e))
 
     def get_streams(self) -> dict[str, StreamInfo]:
-        with self._lock:
-            return dict(self._streams)
+        return dict(self._streams)
 
     def get_stream(self, stream_id: str) -> Optional[StreamInfo]:
-        with self._lock:
-            return self._streams.get(stream_id)
+        return self._streams.get(stream_id)
+
+    def _get_or_create_stream(self, noise_type: str) -> StreamInfo:
+        stream_id = f"noise_{noise_type}"
+        stream_info = self._streams.get(stream_id)
+        if stream_info:
+            return stream_info
+        with self._write_lock:
+            stream_info = self._streams.get(stream_id)
+            if stream_info is not None:
+                return stream_info
+            stream_info = self._create_stream_for_noise(noise_type)
+            self._streams = {**self._streams, stream_id: stream_info}
+            loop_file = self._loop_file_path(noise_type, stream_info.runner.input_file)
+            if loop_file and stream_info.runner.loop_file is None:
+                self._schedule_loop_render(stream_id, loop_file)
+            return stream_info
+
+    def _loop_file_path(self, noise_type: str, input_file: Optional[Path]) -> Optional[Path]:
+        """Return where the pre-rendered loop for a noise type lives, or None if looping is disabled."""
+        cfg = self.base_ffmpeg_config
+        if cfg.loop_duration <= 0:
+            return None
+        source = input_file.stem if input_file else f"{noise_type}_{cfg.loop_duration}s"
+        return self.cache_dir / f"{source}_{cfg.audio_codec}_{cfg.audio_bitrate}_{cfg.sample_rate}.ts"
+
+    def _schedule_loop_render(self, stream_id: str, loop_file: Path) -> None:
+        """Queue a loop render; caller holds _write_lock."""
+        self._render_queue.put((stream_id, loop_file))
+        if self._render_thread is None:
+            self._render_thread = threading.Thread(target=self._render_loops, daemon=True)
+            self._render_thread.start()
+
+    def _render_loops(self) -> None:
+        # Streams encode live until their loop is ready, so startup never waits on a render
+        while True:
+            stream_id, loop_file = self._render_queue.get()
+            stream_info = self._streams.get(stream_id)
+            if not stream_info:
+                continue
+            try:
+                rendered = render_noise_loop(stream_info.noise_type, self.base_ffmpeg_config, loop_file,
+                                             input_file=stream_info.runner.input_file)
+                if not rendered:
+                    logger.warning("Keeping live encoding: noise=%s", stream_info.noise_type)
+                    continue
+                self._switch_to_loop(stream_info, loop_file)
+            except Exception as e:
+                logger.error("Error switching stream %s to its noise loop: %s", stream_id, str(e))
+
+    def _switch_to_loop(self, stream_info: StreamInfo, loop_file: Path) -> None:
+        """Replace a live-encoding runner with one that loops loop_file."""
+        runner = self._new_runner(stream_info.stream_id, stream_info.noise_type,
+                                  Path(stream_info.hls_path), stream_info.runner.input_file, loop_file)
+        with stream_info.lock:
+            previous = stream_info.runner
+            stream_info.runner = runner
+            if not previous.is_running():
+                return
+            logger.info("Switching noise stream to pre-rendered loop: stream_id=%s, loop_file=%s",
+                        stream_info.stream_id, loop_file)
+            self._watcher.disarm(stream_info.stream_id)
+            previous.stop()
+            self._start_locked(stream_info)
+
+    def _new_runner(
+        self,
+        stream_id: str,
+        noise_type: str,
+        hls_dir: Path,
+        input_file: Optional[Path],
+        loop_file: Optional[Path],
+    ) -> NoiseFFmpegRunner:
+        runner = NoiseFFmpegRunner(noise_type, self.base_ffmpeg_config, hls_dir, input_file=input_file,
+                                   selector=self._selector, loop_file=loop_file)
+        runner.on_exit = lambda pid, exit_code: self._on_process_exit(stream_id, pid, exit_code)
+        return runner
 
     def _create_stream_for_noise(self, noise_type: str) -> StreamInfo:
         stream_id = f"noise_{noise_type}"
@@ -109,7 +373,12 @@ class NoiseStreamManager:
         if noise_type == "white" and self._white_noise_sample.exists():
             input_file = self._white_noise_sample
             logger.info("Using WhiteNoise sample file for white noise stream: %s", input_file)
-        runner = NoiseFFmpegRunner(noise_type, self.base_ffmpeg_config, hls_dir, input_file=input_file)
+        loop_file = self._loop_file_path(noise_type, input_file)
+        if loop_file and not loop_file.exists():
+            # Rendered in the background; see _render_loops
+            loop_file = None
+        self._ensure_event_pump()
+        runner = self._new_runner(stream_id, noise_type, hls_dir, input_file, loop_file)
         logger.info("Created noise stream: stream_id=%s, type=%s, hls_dir=%s",
                     stream_id, noise_type, hls_dir)
         return StreamInfo(
@@ -120,6 +389,44 @@ class NoiseStreamManager:
             hls_path=str(hls_dir),
         )
 
+    def _start_locked(self, stream_info: StreamInfo) -> bool:
+        """Start a stream's runner; caller holds stream_info.lock."""
+        stream_info.state = StreamState.STARTING
+        self._invalidate_snapshots()
+        try:
+            success = stream_info.runner.start()
+        except Exception as e:
+            logger.exception("Error starting FFmpeg runner: stream_id=%s, error=%s",
+                             stream_info.stream_id, str(e))
+            success = False
+        if success:
+            stream_info.mark_started(stream_info.runner.pid)
+            stream_info.state = StreamState.RUNNING
+            stream_info.started_at = datetime.now()
+            stream_info.started_at_iso = stream_info.started_at.isoformat()
+            stream_info.error_message = None
+            self._watcher.watch(stream_info.stream_id, Path(stream_info.hls_path))
+        else:
+            stream_info.state = StreamState.ERROR
+            stream_info.error_message = "Failed to start FFmpeg process"
+        self._invalidate_snapshots()
+        return success
+
+    def _stop_locked(self, stream_info: StreamInfo) -> bool:
+        """Stop a stream's runner; caller holds stream_info.lock."""
+        success = stream_info.runner.stop()
+        if success:
+            self._mark_stopped_locked(stream_info)
+        return success
+
+    def _mark_stopped_locked(self, stream_info: StreamInfo) -> None:
+        """Record a stream as stopped; caller holds stream_info.lock."""
+        stream_info.mark_exited()
+        stream_info.state = StreamState.STOPPED
+        stream_info.started_at = None
+        stream_info.started_at_iso = None
+        self._invalidate_snapshots()
+
     def start_all_streams(self) -> dict:
         if not self.noise_types:
             logger.error("No noise types configured; cannot start streams")
@@ -137,29 +444,20 @@ class NoiseStreamManager:
         failed_count = 0
 
         try:
-            with self._lock:
-                for noise in self.noise_types:
-                    stream_id = f"noise_{noise}"
-
-                    if stream_id in self._streams:
-                        existing = self._streams[stream_id]
-                        if existing.runner.is_running():
-                            results.append({
-                                "stream_id": stream_id,
-                                "status": "already_running",
-                                "noise": noise,
-                            })
-                            started_count += 1
-                            continue
-
-                    stream_info = self._create_stream_for_noise(noise)
-                    stream_info.state = StreamState.STARTING
-                    success = stream_info.runner.start()
-
-                    if success:
-                        stream_info.state = StreamState.RUNNING
-                        stream_info.started_at = datetime.now()
-                        stream_info.error_message = None
+            for noise in self.noise_types:
+                stream_info = self._get_or_create_stream(noise)
+                stream_id = stream_info.stream_id
+                with stream_info.lock:
+                    if stream_info.runner.is_running():
+                        results.append({
+                            "stream_id": stream_id,
+                            "status": "already_running",
+                            "noise": noise,
+                        })
+                        started_count += 1
+                        continue
+
+                    if self._start_locked(stream_info):
                         started_count += 1
                         results.append({
                             "stream_id": stream_id,
@@ -168,8 +466,6 @@ class NoiseStreamManager:
                             "stream_url": f"/hls/{stream_id}/stream.m3u8",
                         })
                     else:
-                        stream_info.state = StreamState.ERROR
-                        stream_info.error_message = "Failed to start FFmpeg process"
                         failed_count += 1
                         results.append({
                             "stream_id": stream_id,
@@ -177,8 +473,6 @@ class NoiseStreamManager:
                             "noise": noise,
                             "error": stream_info.error_message,
                         })
-
-                    self._streams[stream_id] = stream_info
         except Exception as exc:  # Defensive: return structured error instead of 500
             logger.exception("Exception while starting noise streams: %s", exc)
             return {
@@ -200,21 +494,22 @@ class NoiseStreamManager:
         }
 
     def stop_all_streams(self) -> dict:
-        logger.info("Stopping all noise streams: total=%d", len(self._streams))
+        streams = self._streams
+        logger.info("Stopping all noise streams: total=%d", len(streams))
         results = []
         stopped_count = 0
-        with self._lock:
-            for stream_id, stream_info in self._streams.items():
+        for stream_id, stream_info in streams.items():
+            with stream_info.lock:
+                self._cancel_restart(stream_id)
+                self._watcher.disarm(stream_id)
                 if stream_info.runner.is_running():
-                    success = stream_info.runner.stop()
-                    if success:
-                        stream_info.state = StreamState.STOPPED
-                        stream_info.started_at = None
+                    if self._stop_locked(stream_info):
                         stopped_count += 1
                         results.append({"stream_id": stream_id, "status": "stopped"})
                     else:
                         results.append({"stream_id": stream_id, "status": "failed_to_stop"})
                 else:
+                    self._mark_stopped_locked(stream_info)
                     results.append({"stream_id": stream_id, "status": "was_not_running"})
         return {
             "success": True,
@@ -224,87 +519,98 @@ class NoiseStreamManager:
         }
 
     def stop_stream(self, stream_id: str) -> dict:
-        with self._lock:
-            stream_info = self._streams.get(stream_id)
-            if not stream_info:
-                return {"success": False, "error": "Stream not found"}
+        stream_info = self._streams.get(stream_id)
+        if not stream_info:
+            return {"success": False, "error": "Stream not found"}
+        with stream_info.lock:
+            self._cancel_restart(stream_id)
+            self._watcher.disarm(stream_id)
             if not stream_info.runner.is_running():
+                # Also cancels a restart the supervisor may already be waiting on
+                self._mark_stopped_locked(stream_info)
                 return {"success": True, "message": "Stream was not running"}
-            success = stream_info.runner.stop()
-            if success:
-                stream_info.state = StreamState.STOPPED
-                stream_info.started_at = None
+            if self._stop_locked(stream_info):
                 return {"success": True, "message": "Stream stopped"}
             else:
                 return {"success": False, "error": "Failed to stop stream"}
 
     def start_stream(self, stream_id: str) -> dict:
         try:
-            with self._lock:
-                stream_info = self._streams.get(stream_id)
-                if not stream_info:
-                    if not stream_id.startswith("noise_"):
-                        return {"success": False, "error": "Stream not found"}
-                    noise_type = stream_id.removeprefix("noise_")
-                    if noise_type not in self.noise_types:
-                        return {"success": False, "error": "Invalid noise type"}
-                    stream_info = self._create_stream_for_noise(noise_type)
-                    self._streams[stream_id] = stream_info
+            stream_info = self._streams.get(stream_id)
+            if not stream_info:
+                if not stream_id.startswith("noise_"):
+                    return {"success": False, "error": "Stream not found"}
+                noise_type = stream_id.removeprefix("noise_")
+                if noise_type not in self.noise_types:
+                    return {"success": False, "error": "Invalid noise type"}
+                stream_info = self._get_or_create_stream(noise_type)
+            with stream_info.lock:
                 if stream_info.runner.is_running():
                     return {"success": True, "message": "Stream already running"}
-                stream_info.state = StreamState.STARTING
-                success = stream_info.runner.start()
-                if success:
-                    stream_info.state = StreamState.RUNNING
-                    stream_info.started_at = datetime.now()
-                    stream_info.error_message = None
+                if self._start_locked(stream_info):
                     return {
                         "success": True,
                         "message": "Stream started",
                         "stream_url": f"/hls/{stream_id}/stream.m3u8",
                     }
                 else:
-                    stream_info.state = StreamState.ERROR
-                    stream_info.error_message = "Failed to start FFmpeg process"
                     return {"success": False, "error": "Failed to start stream"}
         except Exception as exc:
             logger.exception("Exception while starting stream %s: %s", stream_id, exc)
             return {"success": False, "error": str(exc)}
 
+    def _invalidate_snapshots(self) -> None:
+        self._generation += 1
+        self._status_cache = (0.0, None)
+        self._health_cache = (0.0, None)
+
     def get_status(self) -> dict:
-        with self._lock:
-            streams_status = [s.to_dict() for s in self._streams.values()]
-            running_count = sum(1 for s in self._streams.values() if s.runner.is_running())
-            return {
-                "total_streams": len(self._streams),
-                "running_streams": running_count,
-                "stopped_streams": len(self._streams) - running_count,
-                "streams": streams_status,
-            }
+        ts, cached = self._status_cache
+        if cached is not None and time.monotonic() - ts < self._health_ttl:
+            return cached
+        generation = self._generation
+        streams = self._streams
+        streams_status = [s.to_dict() for s in streams.values()]
+        running_count = sum(1 for s in streams.values() if s.running)
+        result = {
+            "total_streams": len(streams),
+            "running_streams": running_count,
+            "stopped_streams": len(streams) - running_count,
+            "streams": streams_status,
+        }
+        if generation == self._generation:
+            self._status_cache = (time.monotonic(), result)
+        return result
 
     def health_check(self) -> dict:
-        with self._lock:
-            stream_health = [s.health_check() for s in self._streams.values()]
-            healthy_count = sum(1 for h in stream_health if h["status"] == "healthy")
-            stopped_count = sum(1 for h in stream_health if h["status"] == "stopped")
-            unhealthy_count = sum(1 for h in stream_health if h["status"] == "unhealthy")
-            if unhealthy_count > 0:
-                overall_status = "degraded"
-            elif healthy_count > 0:
-                overall_status = "healthy"
-            elif stopped_count == len(stream_health) and stopped_count > 0:
-                overall_status = "stopped"
-            elif len(stream_health) == 0:
-                overall_status = "no_streams"
-            else:
-                overall_status = "unknown"
-            return {
-                "status": overall_status,
-                "summary": {
-                    "total": len(stream_health),
-                    "healthy": healthy_count,
-                    "stopped": stopped_count,
-                    "unhealthy": unhealthy_count,
-                },
-                "streams": stream_health,
-            }
+        ts, cached = self._health_cache
+        if cached is not None and time.monotonic() - ts < self._health_ttl:
+            return cached
+        generation = self._generation
+        stream_health = [s.health_check() for s in self._streams.values()]
+        healthy_count = sum(1 for h in stream_health if h["status"] == "healthy")
+        stopped_count = sum(1 for h in stream_health if h["status"] == "stopped")
+        unhealthy_count = sum(1 for h in stream_health if h["status"] == "unhealthy")
+        if unhealthy_count > 0:
+            overall_status = "degraded"
+        elif healthy_count > 0:
+            overall_status = "healthy"
+        elif stopped_count == len(stream_health) and stopped_count > 0:
+            overall_status = "stopped"
+        elif len(stream_health) == 0:
+            overall_status = "no_streams"
+        else:
+            overall_status = "unknown"
+        result = {
+            "status": overall_status,
+            "summary": {
+                "total": len(stream_health),
+                "healthy": healthy_count,
+                "stopped": stopped_count,
+                "unhealthy": unhealthy_count,
+            },
+            "streams": stream_health,
+        }
+        if generation == self._generation:
+            self._health_cache = (time.monotonic(), result)
+        return result
@@ -1,72 +1,247 @@
 """FFmpeg process runner for HLS audio streaming using anoisesrc."""
 
 import logging
+import os
+import selectors
 import shutil
 import subprocess
 import threading
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional
 
 from config import FFmpegConfig
 
 logger = logging.getLogger(__name__)
 
+# Resolved once at import; restarts reuse the absolute paths
+FFMPEG_PATH = shutil.which("ffmpeg")
+TASKSET_PATH = shutil.which("taskset")
+NICE_PATH = shutil.which("nice")
+
+_core_assignments: dict[str, Optional[int]] = {}
+_core_lock = threading.Lock()
+
+
+def _core_for(noise_type: str) -> Optional[int]:
+    """Return the CPU core dedicated to a noise type.
+
+    Cores are handed out round-robin from the process affinity mask, skipping
+    the lowest core so it stays free for the API event loop. Returns None when
+    only one core is available.
+    """
+    with _core_lock:
+        if noise_type not in _core_assignments:
+            cores = sorted(os.sched_getaffinity(0))[1:]
+            _core_assignments[noise_type] = cores[len(_core_assignments) % len(cores)] if cores else None
+        return _core_assignments[noise_type]
+
+
+def _encoder_args(config: FFmpegConfig) -> list[str]:
+    args = ["-c:a", config.audio_codec]
+    if config.audio_codec == "aac":
+        args.extend(["-aac_coder", config.aac_coder])
+    args.extend(["-b:a", config.audio_bitrate, "-threads", "1"])
+    return args
+
+
+def render_noise_loop(
+    noise_type: str,
+    config: FFmpegConfig,
+    output_path: Path,
+    input_file: Optional[Path] = None,
+) -> bool:
+    """Encode a noise clip once so streams can loop it without re-encoding.
+
+    Generated noise is rendered for config.loop_duration seconds; an input
+    file is encoded in full. The clip is written as MPEG-TS so any configured
+    codec can be stream-copied into HLS segments.
+    """
+    if not FFMPEG_PATH:
+        logger.error("FFmpeg not found in PATH")
+        return False
+    tmp_path = output_path.with_name(output_path.name + ".tmp")
+    command = [FFMPEG_PATH, "-y", "-hide_banner", "-loglevel", "error"]
+    if input_file:
+        command.extend(["-i", str(input_file)])
+    else:
+        source = (f"anoisesrc=color={noise_type}:sample_rate={config.sample_rate}"
+                  f":duration={config.loop_duration}")
+        command.extend(["-f", "lavfi", "-i", source])
+    command.extend(_encoder_args(config))
+    command.extend(["-f", "mpegts", str(tmp_path)])
+    logger.info("Rendering noise loop: noise=%s, output=%s", noise_type, output_path)
+    try:
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=600)
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.error("Failed to render noise loop: noise=%s, error=%s", noise_type, str(e))
+        tmp_path.unlink(missing_ok=True)
+        return False
+    if result.returncode != 0:
+        logger.error("Failed to render noise loop: noise=%s, error=%s",
+                     noise_type, result.stderr.decode("utf-8", errors="replace").strip())
+        tmp_path.unlink(missing_ok=True)
+        return False
+    tmp_path.rename(output_path)
+    return True
+
 
 class NoiseFFmpegRunner:
     """Manages FFmpeg process for HLS audio streaming from generated noise."""
 
-    def __init__(self, noise_type: str, config: FFmpegConfig, hls_dir: Path, input_file: Optional[Path] = None):
+    def __init__(
+        self,
+        noise_type: str,
+        config: FFmpegConfig,
+        hls_dir: Path,
+        input_file: Optional[Path] = None,
+        *,
+        selector: selectors.BaseSelector,
+        loop_file: Optional[Path] = None,
+    ):
         """Initialize FFmpeg runner.
 
         Args:
             noise_type: One of 'white', 'pink', 'brown'.
             config: FFmpeg configuration settings.
             hls_dir: Directory to output HLS segments.
+            selector: Shared selector on which the process's stderr pipe and
+                pidfd (where pidfd_open is available) are registered; its
+                owner must dispatch ready keys by calling key.data().
+            loop_file: Pre-rendered clip (see render_noise_loop) to loop with
+                stream copy instead of encoding live.
         """
+        if not FFMPEG_PATH:
+            raise RuntimeError("FFmpeg not found in PATH")
         self.noise_type = noise_type.lower()
         self.config = config
         self.hls_dir = hls_dir
         self.input_file = input_file
+        self.selector = selector
+        self.loop_file = loop_file
         self._process: Optional[subprocess.Popen] = None
+        # Flipped by the pidfd handler; lets is_running() avoid waitpid()
+        self._alive = False
         self._lock = threading.Lock()
-        self._stderr_thread: Optional[threading.Thread] = None
-        self._last_error: Optional[str] = None
+        self._err_partial = b""
+        # Raw last stderr line; decoded only when status is requested
+        self._last_error: Optional[bytes] = None
+        # Invoked with (pid, exit code) when the process exits without stop()
+        self.on_exit: Optional[Callable[[int, int], None]] = None
+        # Identical across restarts; a config change requires a new runner
+        self._cmd = self._scheduling_prefix() + self._build_command()
 
-    def _read_stderr(self) -> None:
-        if not self._process or not self._process.stderr:
-            return
+    def feed_stderr(self, chunk: bytes) -> None:
+        """Consume a chunk of FFmpeg stderr read by the shared pump."""
+        data = self._err_partial + chunk.replace(b"\r", b"\n")
+        lines = data.split(b"\n")
+        self._err_partial = lines.pop()[-4096:]
+        # FFmpeg runs with -loglevel error, so every line it prints is an error
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            logger.error("FFmpeg error: %s", line.decode("utf-8", errors="replace"))
+            self._last_error = line
+
+    @property
+    def last_error(self) -> Optional[str]:
+        """Last line FFmpeg wrote to stderr, if any."""
+        if self._last_error is None:
+            return None
+        return self._last_error.decode("utf-8", errors="replace")
+
+    def _unregister(self, fileobj) -> None:
+        try:
+            self.selector.unregister(fileobj)
+        except (KeyError, ValueError):
+            pass
+
+    def _drain_stderr(self, process: subprocess.Popen) -> None:
+        stream = process.stderr
         try:
-            for line in iter(self._process.stderr.readline, b""):
-                if not line:
-                    break
-                decoded_line = line.decode("utf-8", errors="replace").strip()
-                if "error" in decoded_line.lower():
-                    logger.error("FFmpeg error: %s", decoded_line)
-                    self._last_error = decoded_line
-                elif "warning" in decoded_line.lower():
-                    logger.warning("FFmpeg warning: %s", decoded_line)
-        except Exception as e:
-            logger.error("Error reading FFmpeg stderr: %s", str(e))
+            chunk = os.read(stream.fileno(), 4096)
+        except OSError:
+            chunk = b""
+        if chunk:
+            self.feed_stderr(chunk)
+            return
+        self._unregister(stream)
+        stream.close()
+
+    def _reap(self, process: subprocess.Popen, pidfd: int) -> None:
+        self._unregister(pidfd)
+        os.close(pidfd)
+        # The pidfd only becomes readable once the process has exited. This
+        # runs on the pump thread, so drain stderr first: FFmpeg's last line is
+        # usually the exit reason reported through last_error.
+        while not process.stderr.closed:
+            self._drain_stderr(process)
+        self._handle_exit(process, process.wait())
+
+    def _handle_exit(self, process: subprocess.Popen, exit_code: int) -> None:
+        # stop() detaches the process before terminating it. The unlocked check
+        # keeps the shared pump from waiting on a stop() in progress; the locked
+        # one keeps a stale exit from clearing _alive for a newer process.
+        if process is not self._process:
+            return
+        with self._lock:
+            if process is not self._process:
+                return
+            self._alive = False
+        logger.warning("FFmpeg process exited: pid=%d, noise=%s, exit_code=%d",
+                       process.pid, self.noise_type, exit_code)
+        if self.on_exit:
+            try:
+                self.on_exit(process.pid, exit_code)
+            except Exception as e:
+                logger.error("Error in FFmpeg exit callback: %s", str(e))
+
+    def _scheduling_prefix(self) -> list[str]:
+        """Build taskset/nice wrappers that pin and deprioritize FFmpeg.
+
+        Wrapping the command (rather than using preexec_fn) applies the
+        affinity before FFmpeg spawns any threads and is safe to use from a
+        multi-threaded parent.
+        """
+        prefix: list[str] = []
+        if self.config.cpu_affinity:
+            core = _core_for(self.noise_type)
+            if core is not None and TASKSET_PATH:
+                prefix.extend([TASKSET_PATH, "-c", str(core)])
+        if self.config.nice > 0 and NICE_PATH:
+            prefix.extend([NICE_PATH, "-n", str(self.config.nice)])
+        return prefix
 
     def _build_command(self) -> list[str]:
         """Build FFmpeg command for HLS streaming from generated noise."""
         output_path = self.hls_dir / "stream.m3u8"
         segment_path = self.hls_dir / "segment%05d.ts"
 
-        command = ["ffmpeg", "-re"]
-        if self.input_file:
+        command = [
+            FFMPEG_PATH, "-hide_banner", "-loglevel", "error", "-nostats",
+            "-filter_threads", "1", "-re",
+        ]
+        if self.loop_file:
+            # Pre-encoded clip: only remux, no per-sample work
+            command.extend([
+                "-stream_loop", "-1",
+                "-i", str(self.loop_file),
+                "-c:a", "copy",
+            ])
+        elif self.input_file:
             command.extend([
                 "-stream_loop", "-1",
                 "-i", str(self.input_file),
             ])
+            command.extend(_encoder_args(self.config))
         else:
             # anoisesrc supports color=white|pink|brown
             source = f"anoisesrc=color={self.noise_type}:sample_rate={self.config.sample_rate}"
             command.extend(["-f", "lavfi", "-i", source])
+            command.extend(_encoder_args(self.config))
 
         command.extend([
-            "-c:a", "aac",
-            "-b:a", self.config.audio_bitrate,
             "-f", "hls",
             "-hls_time", str(self.config.segment_time),
             "-hls_list_size", str(self.config.list_size),
@@ -75,10 +250,12 @@ class NoiseFFmpegRunner:
             str(output_path),
         ])
         logger.debug(
-            "Built FFmpeg command: noise=%s, input_file=%s, sample_rate=%d, bitrate=%s, segment_time=%d, list_size=%d, output=%s",
+            "Built FFmpeg command: noise=%s, input_file=%s, loop_file=%s, sample_rate=%d, codec=%s, bitrate=%s, segment_time=%d, list_size=%d, output=%s",
             self.noise_type,
             str(self.input_file) if self.input_file else None,
+            str(self.loop_file) if self.loop_file else None,
             self.config.sample_rate,
+            self.config.audio_codec,
             self.config.audio_bitrate,
             self.config.segment_time,
             self.config.list_size,
@@ -88,64 +265,87 @@ class NoiseFFmpegRunner:
 
     def start(self) -> bool:
         with self._lock:
-            if self._process is not None and self._process.poll() is None:
+            if self._process is not None and self._alive:
                 logger.warning("FFmpeg process already running: pid=%d, noise=%s",
                                self._process.pid, self.noise_type)
                 return False
 
             self.hls_dir.mkdir(parents=True, exist_ok=True)
-            ffmpeg_path = shutil.which("ffmpeg")
-            if not ffmpeg_path:
-                logger.error("FFmpeg not found in PATH")
-                return False
 
-            cmd = self._build_command()
             logger.info("Starting FFmpeg process: noise=%s, hls_dir=%s",
                         self.noise_type, self.hls_dir)
+            self._err_partial = b""
+            self._last_error = None
             try:
-                self._process = subprocess.Popen(
-                    cmd,
-                    stdout=subprocess.PIPE,
+                process = subprocess.Popen(
+                    self._cmd,
+                    stdout=subprocess.DEVNULL,
                     stderr=subprocess.PIPE,
                 )
-                self._stderr_thread = threading.Thread(target=self._read_stderr, daemon=True)
-                self._stderr_thread.start()
-                self._last_error = None
-                return True
             except FileNotFoundError:
                 logger.error("FFmpeg executable not found", exc_info=True)
                 return False
-            except subprocess.SubprocessError as e:
+            except (subprocess.SubprocessError, OSError) as e:
                 logger.error("Failed to start FFmpeg process: noise=%s, error=%s",
                              self.noise_type, str(e), exc_info=True)
                 return False
 
+            # Published before registering so _handle_exit recognises a fast exit
+            self._process = process
+            self._alive = True
+            try:
+                self.selector.register(process.stderr, selectors.EVENT_READ,
+                                       lambda: self._drain_stderr(process))
+            except (OSError, ValueError, KeyError) as e:
+                logger.error("Failed to watch FFmpeg stderr; killing it: pid=%d, noise=%s, error=%s",
+                             process.pid, self.noise_type, str(e))
+                self._process = None
+                self._alive = False
+                process.kill()
+                process.wait()
+                process.stderr.close()
+                return False
+            self._watch_exit(process)
+            return True
+
+    def _watch_exit(self, process: subprocess.Popen) -> None:
+        """Arrange for _handle_exit to run once the process exits."""
+        try:
+            pidfd = os.pidfd_open(process.pid)
+        except OSError as e:
+            # Linux < 5.3, gVisor and some seccomp profiles lack pidfd_open
+            logger.info("pidfd unavailable, waiting on FFmpeg in a thread: noise=%s, error=%s",
+                        self.noise_type, str(e))
+            threading.Thread(target=self._wait_for_exit, args=(process,), daemon=True).start()
+            return
+        self.selector.register(pidfd, selectors.EVENT_READ,
+                               lambda: self._reap(process, pidfd))
+
+    def _wait_for_exit(self, process: subprocess.Popen) -> None:
+        self._handle_exit(process, process.wait())
+
     def stop(self) -> bool:
         with self._lock:
-            if self._process is None:
+            process = self._process
+            if process is None:
                 logger.warning("No FFmpeg process to stop")
                 return False
-            if self._process.poll() is not None:
-                self._process = None
+            self._process = None
+            if not self._alive:
                 return True
-            self._process.terminate()
+            self._alive = False
+            process.terminate()
             try:
-                self._process.wait(timeout=5)
+                process.wait(timeout=5)
             except subprocess.TimeoutExpired:
-                self._process.kill()
-                self._process.wait()
-            self._process = None
+                process.kill()
+                process.wait()
             return True
 
-    def is_running(self) -> bool:
+    @property
+    def pid(self) -> Optional[int]:
         with self._lock:
-            return self._process is not None and self._process.poll() is None
+            return self._process.pid if self._process is not None else None
 
-    def get_status(self) -> dict:
-        with self._lock:
-            if self._process is None:
-                return {"running": False, "pid": None}
-            poll_result = self._process.poll()
-            if poll_result is not None:
-                return {"running": False, "pid": None, "exit_code": poll_result, "error": self._last_error}
-            return {"running": True, "pid": self._process.pid, "error": self._last_error}
+    def is_running(self) -> bool:
+        return self._alive